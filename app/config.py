@@ -6,3 +6,9 @@ load_dotenv()
 EMAIL = os.getenv("EMAIL", "")
 SECRET = os.getenv("SECRET", "")
 MAX_QUIZ_SECONDS = int(os.getenv("MAX_QUIZ_SECONDS", "180"))  # 3 minutes default
+MEMO_TTL_SECONDS = int(os.getenv("MEMO_TTL_SECONDS", "3600"))  # answer memo lifetime, 0 disables
+MEMO_MAX_ENTRIES = int(os.getenv("MEMO_MAX_ENTRIES", "1024"))
+PLANNER_BACKEND = os.getenv("PLANNER_BACKEND", "rules")
+PLANNER_BATCH_WINDOW_MS = int(os.getenv("PLANNER_BATCH_WINDOW_MS", "50"))  # wait to batch concurrent plan calls
+PLANNER_CACHE_TTL_SECONDS = int(os.getenv("PLANNER_CACHE_TTL_SECONDS", "3600"))
+PLANNER_CACHE_MAX_ENTRIES = int(os.getenv("PLANNER_CACHE_MAX_ENTRIES", "1024"))
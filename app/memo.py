@@ -0,0 +1,88 @@
+# app/memo.py
+# In-process answer memo shared by all quiz requests.
+
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple, Union
+
+from app.config import MEMO_TTL_SECONDS, MEMO_MAX_ENTRIES
+
+
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_USER_PARAM_RE = re.compile(r"([?&](?:email|id|user|uid|secret)=)[^&\s'\"<>]*", re.I)
+_WS_RE = re.compile(r"\s+")
+
+
+def normalize_instructions(text: str) -> str:
+    """Strip per-user details (emails, id-like query params) and collapse whitespace."""
+    text = _USER_PARAM_RE.sub(r"\1<user>", text or "")
+    text = _EMAIL_RE.sub("<email>", text)
+    return _WS_RE.sub(" ", text).strip().lower()
+
+
+def page_fingerprint(instructions: str, attachments: Iterable[Union[bytes, str]] = ()) -> str:
+    """Hash normalized instructions plus the content of every attachment (PDF bytes, table HTML, ...)."""
+    h = hashlib.sha256(normalize_instructions(instructions).encode())
+    for att in attachments:
+        if isinstance(att, str):
+            att = att.encode()
+        h.update(b"\0" + hashlib.sha256(att).digest())
+    return h.hexdigest()
+
+
+class AnswerMemo:
+    """
+    Thread-safe TTL store mapping page fingerprints to previously submitted answers.
+    Oldest entries are evicted once max_entries is reached.
+    """
+
+    def __init__(self, ttl_seconds: int = MEMO_TTL_SECONDS, max_entries: int = MEMO_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored answer, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, answer = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            return answer
+
+    def put(self, key: str, answer: Any) -> None:
+        if self.ttl_seconds <= 0 or answer is None:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, answer)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def record(self, key: str, answer: Any, submit_response: Dict[str, Any]) -> None:
+        """
+        Update the memo from a submit response: keep the answer only when the server
+        confirmed it (correct: true); anything else (wrong, unknown, failed submit) drops it.
+        """
+        if submit_response.get("correct") is True:
+            self.put(key, answer)
+        else:
+            self.invalidate(key)
+
+
+answer_memo = AnswerMemo()
@@ -0,0 +1,211 @@
+# app/planner.py
+# Planning stage: turns quiz instructions into a structured plan that the solver executes
+# with its pandas/pdf/viz helpers. Backends are pluggable; "rules" works fully offline.
+
+import abc
+import re
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Type
+
+from app.config import (
+    PLANNER_BACKEND,
+    PLANNER_BATCH_WINDOW_MS,
+    PLANNER_CACHE_TTL_SECONDS,
+    PLANNER_CACHE_MAX_ENTRIES,
+)
+from app.memo import AnswerMemo, page_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Plan:
+    source: str                  # "pdf" | "html_table" | "csv"
+    operation: str               # "sum" | "mean" | "count" | "max" | "min" | "chart"
+    output: str                  # "number" | "image"
+    page: Optional[int] = None   # 1-based page for PDF sources
+    column: Optional[str] = None
+
+
+# -----------------------------------------------------------
+# Backends
+# -----------------------------------------------------------
+
+class PlannerBackend(abc.ABC):
+    @abc.abstractmethod
+    def plan_batch(self, instructions: List[str]) -> List[Optional[Plan]]:
+        """Return one plan (or None if no plan could be made) per instruction text."""
+
+
+_OPERATIONS = [
+    ("chart", r"\b(?:chart|plot|visuali[sz]e|graph)\b"),
+    ("mean", r"\b(?:average|mean(?=\s+(?:of|value)\b))"),
+    ("max", r"\b(?:max(?:imum)?|largest|highest)\b"),
+    ("min", r"\b(?:min(?:imum)?|smallest|lowest)\b"),
+    ("count", r"\b(?:count|how many|number of rows)\b"),
+    ("sum", r"\b(?:sum|total)\b"),
+]
+
+# Conditions a Plan cannot express; planning these would silently drop the condition.
+_UNSUPPORTED = re.compile(
+    r"\b(?:where|greater than|less than|more than|fewer than|at least|at most|filter(?:ed|ing)?|per|"
+    r"group(?:ed)? by|for each|excluding)\b|[<>]=?",
+    re.I,
+)
+
+
+class RuleBasedBackend(PlannerBackend):
+    """Deterministic regex planner; no network or model required."""
+
+    def plan_batch(self, instructions: List[str]) -> List[Optional[Plan]]:
+        return [self._plan_one(text) for text in instructions]
+
+    def _plan_one(self, text: str) -> Optional[Plan]:
+        text = text or ""
+        if _UNSUPPORTED.search(text):
+            return None
+        matches = [(m.start(), op) for op, pat in _OPERATIONS for m in [re.search(pat, text, re.I)] if m]
+        if not matches:
+            return None
+        operation = min(matches)[1]
+
+        if re.search(r"\bpdf\b", text, re.I):
+            source = "pdf"
+        elif re.search(r"\bcsv\b", text, re.I):
+            source = "csv"
+        else:
+            source = "html_table"
+
+        m_page = re.search(r"\bpage\s+(\d+)", text, re.I)
+        m_col = (
+            re.search(r"[\"'“‘]([^\"'”’]{1,40})[\"'”’]\s+column", text, re.I)
+            or re.search(r"\bcolumn\s+[\"'“‘]([^\"'”’]{1,40})[\"'”’]", text, re.I)
+            or re.search(r"\bthe\s+(\w+)\s+column", text, re.I)
+        )
+        # Aggregates need to know which column to read; "POST the total to /submit" is not a plan.
+        if operation in ("sum", "mean", "max", "min") and not m_col:
+            return None
+
+        return Plan(
+            source=source,
+            operation=operation,
+            output="image" if operation == "chart" else "number",
+            page=int(m_page.group(1)) if m_page else None,
+            column=m_col.group(1).strip() if m_col else None,
+        )
+
+
+_BACKENDS: Dict[str, Type[PlannerBackend]] = {"rules": RuleBasedBackend}
+
+
+def register_backend(name: str, backend_cls: Type[PlannerBackend]) -> None:
+    _BACKENDS[name] = backend_cls
+
+
+def get_backend(name: str) -> PlannerBackend:
+    if name not in _BACKENDS:
+        raise ValueError(f"Unknown planner backend: {name}")
+    return _BACKENDS[name]()
+
+
+# -----------------------------------------------------------
+# Cached, batched planner
+# -----------------------------------------------------------
+
+class _Slot:
+    """Hand-off point between the thread that runs a batch and the threads waiting on it."""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.plan: Optional[Plan] = None
+
+
+class Planner:
+    """
+    Caches plans by instruction fingerprint and batches concurrent plan() calls:
+    the first caller starts a worker that waits batch_window_ms, then plans every
+    pending request in a single backend call. Every caller, including the first,
+    only waits for its result up to its own timeout.
+    Only successful plans are cached (bounded and expiring, like the answer memo).
+    """
+
+    def __init__(self, backend: PlannerBackend, batch_window_ms: int = PLANNER_BATCH_WINDOW_MS):
+        self.backend = backend
+        self.batch_window = batch_window_ms / 1000.0
+        self._cache = AnswerMemo(ttl_seconds=PLANNER_CACHE_TTL_SECONDS, max_entries=PLANNER_CACHE_MAX_ENTRIES)
+        self._pending: Dict[str, str] = {}        # fingerprint -> instructions
+        self._slots: Dict[str, _Slot] = {}
+        self._lock = threading.Lock()
+        self._leader_active = False
+
+    def plan(self, instructions: str, timeout: Optional[float] = None) -> Optional[Plan]:
+        """Return the plan for these instructions, or None if none was made within timeout seconds."""
+        key = page_fingerprint(instructions)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = _Slot()
+                self._pending[key] = instructions
+            lead = not self._leader_active
+            if lead:
+                self._leader_active = True
+
+        if lead:
+            threading.Thread(target=self._lead_batch, daemon=True).start()
+        if not slot.event.wait(timeout):
+            return None
+        return slot.plan
+
+    def _lead_batch(self) -> None:
+        self._wait_for_batch()
+        self._run_batch()
+
+    def _wait_for_batch(self) -> None:
+        time.sleep(self.batch_window)
+
+    def _run_batch(self) -> None:
+        with self._lock:
+            batch = self._pending
+            self._pending = {}
+            self._leader_active = False
+            slots = {key: self._slots.pop(key) for key in batch}
+        keys = list(batch)
+        plans: List[Optional[Plan]] = [None] * len(keys)
+        try:
+            result = self.backend.plan_batch([batch[k] for k in keys])
+            if len(result) == len(keys):
+                plans = list(result)
+            else:
+                logger.warning("Planner backend returned %d plans for %d instructions", len(result), len(keys))
+        except Exception:
+            logger.exception("Planner backend failed")
+        finally:
+            for key, plan in zip(keys, plans):
+                slots[key].plan = plan
+                self._cache.put(key, plan)
+                slots[key].event.set()
+
+
+_planner: Optional[Planner] = None
+_planner_lock = threading.Lock()
+
+
+def get_planner() -> Planner:
+    """Build the shared planner on first use, falling back to the rule-based backend."""
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            try:
+                backend = get_backend(PLANNER_BACKEND)
+            except ValueError:
+                logger.warning("Unknown planner backend %r, falling back to 'rules'", PLANNER_BACKEND)
+                backend = RuleBasedBackend()
+            _planner = Planner(backend)
+        return _planner
@@ -5,7 +5,7 @@ import re
 import json
 import base64
 import io
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional
 from urllib.parse import urljoin
 
 import requests
@@ -16,6 +16,8 @@ import matplotlib.pyplot as plt
 
 from app.config import MAX_QUIZ_SECONDS
 from app.submitter import submit_answer
+from app.memo import answer_memo, page_fingerprint
+from app.planner import get_planner, Plan
 
 
 # -----------------------------------------------------------
@@ -63,6 +65,24 @@ def _scan_text_for_submit_url(text: str) -> Optional[str]:
     return urls[0]  # fallback: first URL
 
 
+def _clean_numeric(series: pd.Series) -> pd.Series:
+    """Coerce a column to numbers, stripping currency symbols, commas, etc. from text cells."""
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    return pd.to_numeric(
+        series.astype(str).str.replace(r"[^\d\.-]", "", regex=True),
+        errors="coerce"
+    )
+
+
+def _pdf_page_dataframe(pdf_page) -> Optional[pd.DataFrame]:
+    """Turn the first table on a pdfplumber page into a dataframe (header row → columns)."""
+    table = pdf_page.extract_table()
+    if table and len(table) > 1:
+        return pd.DataFrame(table[1:], columns=table[0])
+    return None
+
+
 def _sum_value_in_pdf_bytes(pdf_bytes: bytes) -> Optional[float]:
     """Parse PDF content, extract table on page 2, and sum 'value' column."""
     try:
@@ -73,16 +93,11 @@ def _sum_value_in_pdf_bytes(pdf_bytes: bytes) -> Optional[float]:
             page2 = pdf.pages[1]
 
             # Try table extraction
-            table = page2.extract_table()
-            if table and len(table) > 1:
-                df = pd.DataFrame(table[1:], columns=table[0])
+            df = _pdf_page_dataframe(page2)
+            if df is not None:
                 candidates = [c for c in df.columns if "value" in str(c).lower()]
                 if candidates:
-                    col = candidates[0]
-                    total = pd.to_numeric(
-                        df[col].astype(str).str.replace(r"[^\d\.-]", "", regex=True),
-                        errors="coerce"
-                    ).sum()
+                    total = _clean_numeric(df[candidates[0]]).sum()
                     return float(total)
 
             # Fallback: sum all numbers on page
@@ -130,7 +145,15 @@ def _make_plot_datauri_from_html_table(html: str) -> Optional[str]:
         if not dfs:
             return None
 
-        df = dfs[0]
+        return _make_plot_datauri_from_df(dfs[0])
+
+    except Exception:
+        return None
+
+
+def _make_plot_datauri_from_df(df: pd.DataFrame) -> Optional[str]:
+    """Plot the first one or two numeric columns of a dataframe as a PNG data URI."""
+    try:
         numeric = df.select_dtypes(include=["number"])
         if numeric.shape[1] == 0:
             return None
@@ -155,6 +178,124 @@ def _make_plot_datauri_from_html_table(html: str) -> Optional[str]:
         return None
 
 
+def _answer_from_html_table(html_table: str, body_text: str) -> Optional[Any]:
+    """Sum of values if the table has them, else a chart when the page asks for one."""
+    total = _sum_value_in_html_table(html_table)
+    if total is not None:
+        return float(total)
+    if re.search(r"generate.*chart|plot|visual", body_text, re.I):
+        return _make_plot_datauri_from_html_table(html_table)
+    return None
+
+
+def _dataframe_from_pdf_bytes(pdf_bytes: bytes, page_no: int) -> Optional[pd.DataFrame]:
+    """Extract the first table on a 1-based PDF page as a dataframe."""
+    try:
+        with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+            if not 1 <= page_no <= len(pdf.pages):
+                return None
+            return _pdf_page_dataframe(pdf.pages[page_no - 1])
+    except Exception:
+        return None
+
+
+def _pick_plan_column(df: pd.DataFrame, column: Optional[str]) -> Optional[str]:
+    """
+    Named column if the plan gave one (None if it is missing), otherwise the first
+    column where at least half the cells parse as numbers.
+    """
+    if column:
+        candidates = [c for c in df.columns if column.lower() in str(c).lower()]
+        return candidates[0] if candidates else None
+    for c in df.columns:
+        if _clean_numeric(df[c]).notna().sum() * 2 >= max(len(df), 1):
+            return c
+    return None
+
+
+def _execute_plan(plan: Plan, df: pd.DataFrame):
+    """Apply the plan's operation to an already-loaded dataframe; None if it cannot be applied."""
+    if plan.operation == "chart":
+        if plan.column:
+            col = _pick_plan_column(df, plan.column)
+            if col is None:
+                return None
+            df = df[[col]]
+        numeric = df.apply(_clean_numeric).dropna(axis=1, how="all")
+        return _make_plot_datauri_from_df(numeric)
+
+    if plan.operation == "count":
+        return int(len(df))
+
+    col = _pick_plan_column(df, plan.column)
+    if col is None:
+        return None
+    values = _clean_numeric(df[col]).dropna()
+    if values.empty:
+        return None
+    return float(getattr(values, plan.operation)())
+
+
+def _load_plan_data(plan: Plan, page, anchors) -> Optional[tuple]:
+    """Fetch the plan's data source; returns (raw attachment, dataframe) or None."""
+    if plan.source == "html_table":
+        table = page.query_selector("table")
+        if not table:
+            return None
+        html_table = table.evaluate("(node) => node.outerHTML")
+        dfs = pd.read_html(html_table)
+        return (html_table, dfs[0]) if dfs else None
+
+    ext = ".pdf" if plan.source == "pdf" else ".csv"
+    link = next((h for h in anchors if h and str(h).lower().split("?")[0].endswith(ext)), None)
+    if not link:
+        return None
+    r = requests.get(urljoin(page.url, link), timeout=20)
+    if not r.ok:
+        return None
+    if plan.source == "pdf":
+        df = _dataframe_from_pdf_bytes(r.content, plan.page or 1)
+    else:
+        df = pd.read_csv(io.BytesIO(r.content))
+    return (r.content, df) if df is not None else None
+
+
+def _submit_and_memoize(submit_url: str, payload: Dict[str, Any], memo_key: str) -> Dict[str, Any]:
+    """Submit the answer and update the shared memo with the server's verdict."""
+    resp = submit_answer(submit_url, payload)
+    answer_memo.record(memo_key, payload["answer"], resp)
+    return resp
+
+
+def _solve_with_memo(
+    memo_key: str,
+    compute: Callable[[], Any],
+    submit_url: str,
+    payload: Dict[str, Any],
+    results: list,
+) -> Optional[Dict[str, Any]]:
+    """
+    Submit the memoized answer for memo_key if there is one; on a miss, or if the server
+    rejects it, compute() a fresh answer and submit that unless it equals the rejected one.
+    Appends a results entry per submission and returns the last submit response
+    (None if nothing was submitted).
+    """
+    resp = None
+    cached = answer_memo.get(memo_key)
+    if cached is not None:
+        resp = _submit_and_memoize(submit_url, {**payload, "answer": cached}, memo_key)
+        results.append({"url": payload["url"], "submit_response": resp, "memo_hit": True})
+        if resp.get("correct") is not False:
+            return resp
+
+    answer = compute()
+    if answer is None or (cached is not None and answer == cached):
+        return resp
+    resp = _submit_and_memoize(submit_url, {**payload, "answer": answer}, memo_key)
+    results.append({"url": payload["url"], "submit_response": resp, "memo_hit": False})
+    return resp
+
+
 # -----------------------------------------------------------
 # Core synchronous solver
 # -----------------------------------------------------------
@@ -208,7 +349,7 @@ def run_sync_solver(payload: Dict[str, Any]) -> Dict[str, Any]:
                         resolved_submit,
                         {"email": email, "secret": secret, "url": current_url, "answer": answer}
                     )
-                    results.append({"url": current_url, "submit_response": resp})
+                    results.append({"url": current_url, "submit_response": resp, "memo_hit": False})
                     current_url = resp.get("url")
                     continue
 
@@ -232,13 +373,14 @@ def run_sync_solver(payload: Dict[str, Any]) -> Dict[str, Any]:
                 try:
                     r = requests.get(pdf_link, timeout=20)
                     if r.ok:
-                        total = _sum_value_in_pdf_bytes(r.content)
-                        if total is not None:
-                            resp = submit_answer(
-                                resolved_submit,
-                                {"email": email, "secret": secret, "url": current_url, "answer": float(total)}
-                            )
-                            results.append({"url": current_url, "submit_response": resp})
+                        resp = _solve_with_memo(
+                            page_fingerprint(body_text, [r.content]),
+                            lambda: _sum_value_in_pdf_bytes(r.content),
+                            resolved_submit,
+                            {"email": email, "secret": secret, "url": current_url},
+                            results
+                        )
+                        if resp is not None:
                             current_url = resp.get("url")
                             continue
                 except Exception:
@@ -252,28 +394,16 @@ def run_sync_solver(payload: Dict[str, Any]) -> Dict[str, Any]:
                 if table:
                     html_table = table.evaluate("(node) => node.outerHTML")
 
-                    # Try sum of values
-                    total = _sum_value_in_html_table(html_table)
-                    if total is not None:
-                        resp = submit_answer(
-                            resolved_submit,
-                            {"email": email, "secret": secret, "url": current_url, "answer": float(total)}
-                        )
-                        results.append({"url": current_url, "submit_response": resp})
+                    resp = _solve_with_memo(
+                        page_fingerprint(body_text, [html_table]),
+                        lambda: _answer_from_html_table(html_table, body_text),
+                        resolved_submit,
+                        {"email": email, "secret": secret, "url": current_url},
+                        results
+                    )
+                    if resp is not None:
                         current_url = resp.get("url")
                         continue
-
-                    # Try visualization
-                    if re.search(r"generate.*chart|plot|visual", body_text, re.I):
-                        datauri = _make_plot_datauri_from_html_table(html_table)
-                        if datauri:
-                            resp = submit_answer(
-                                resolved_submit,
-                                {"email": email, "secret": secret, "url": current_url, "answer": datauri}
-                            )
-                            results.append({"url": current_url, "submit_response": resp})
-                            current_url = resp.get("url")
-                            continue
             except Exception:
                 pass
 
@@ -289,12 +419,33 @@ def run_sync_solver(payload: Dict[str, Any]) -> Dict[str, Any]:
                             resolved_submit,
                             {"email": email, "secret": secret, "url": current_url, "answer": parsed["answer"]}
                         )
-                        results.append({"url": current_url, "submit_response": resp})
+                        results.append({"url": current_url, "submit_response": resp, "memo_hit": False})
                         current_url = resp.get("url")
                         continue
                 except Exception:
                     pass
 
+            # ---------------------------------------------------
+            # 6) Planner: instructions → structured plan → execute
+            # ---------------------------------------------------
+            try:
+                plan = get_planner().plan(body_text, timeout=max(deadline - now_seconds(), 0))
+                loaded = _load_plan_data(plan, page, anchors) if plan else None
+                if loaded:
+                    raw, df = loaded
+                    resp = _solve_with_memo(
+                        page_fingerprint(body_text, [raw]),
+                        lambda: _execute_plan(plan, df),
+                        resolved_submit,
+                        {"email": email, "secret": secret, "url": current_url},
+                        results
+                    )
+                    if resp is not None:
+                        current_url = resp.get("url")
+                        continue
+            except Exception:
+                pass
+
             # ---------------------------------------------------
             # No handler matched → stop
             # ---------------------------------------------------
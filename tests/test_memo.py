@@ -0,0 +1,76 @@
+import app.memo
+import app.solver
+from app.memo import AnswerMemo, normalize_instructions, page_fingerprint
+
+
+def test_fingerprint_ignores_user_details():
+    a = page_fingerprint("Sum the value column. email=alice@example.com", [b"%PDF-1"])
+    b = page_fingerprint("Sum the  value column.\nemail=bob@example.org", [b"%PDF-1"])
+    assert a == b
+
+def test_fingerprint_depends_on_attachment_content():
+    assert page_fingerprint("Sum it", [b"one"]) != page_fingerprint("Sum it", [b"two"])
+
+def test_memo_hit_and_expiry(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(app.memo.time, "monotonic", lambda: clock[0])
+    memo = AnswerMemo(ttl_seconds=60)
+    memo.put("k", 42.0)
+    clock[0] += 59
+    assert memo.get("k") == 42.0
+    clock[0] += 2
+    assert memo.get("k") is None
+
+def test_memo_disabled_with_zero_ttl():
+    memo = AnswerMemo(ttl_seconds=0)
+    memo.put("k", 42.0)
+    assert memo.get("k") is None
+
+def test_memo_evicts_oldest_at_max_entries():
+    memo = AnswerMemo(ttl_seconds=60, max_entries=2)
+    memo.put("a", 1)
+    memo.put("b", 2)
+    memo.put("c", 3)
+    assert memo.get("a") is None
+    assert memo.get("b") == 2 and memo.get("c") == 3
+
+def test_memo_invalidated_on_wrong_answer():
+    memo = AnswerMemo(ttl_seconds=60)
+    memo.record("k", 1.0, {"correct": True})
+    assert memo.get("k") == 1.0
+    memo.record("k", 1.0, {"correct": False, "reason": "wrong sum"})
+    assert memo.get("k") is None
+
+def test_memo_ignores_unverified_responses():
+    memo = AnswerMemo(ttl_seconds=60)
+    memo.record("k", 1.0, {"status_code": 500, "text": "oops"})
+    assert memo.get("k") is None
+    memo.put("k", 1.0)
+    memo.record("k", 1.0, {"url": "http://example.com/next"})
+    assert memo.get("k") is None
+
+def test_normalize_strips_user_param_before_email():
+    assert normalize_instructions("see ?email=a@b.com&x=1") == "see ?email=<user>&x=1"
+
+def test_rejected_memo_hit_recomputes_without_resubmitting_same_answer(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(app.solver, "answer_memo", AnswerMemo(ttl_seconds=60))
+    monkeypatch.setattr(app.solver, "submit_answer",
+                        lambda url, payload: submitted.append(payload["answer"]) or {"correct": False, "url": "next"})
+    app.solver.answer_memo.put("k", 5.0)
+    results = []
+    resp = app.solver._solve_with_memo("k", lambda: 5.0, "http://s", {"url": "u"}, results)
+    assert submitted == [5.0] and resp["url"] == "next"
+    assert [r["memo_hit"] for r in results] == [True]
+
+def test_rejected_memo_hit_submits_fresh_answer(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(app.solver, "answer_memo", AnswerMemo(ttl_seconds=60))
+    monkeypatch.setattr(app.solver, "submit_answer",
+                        lambda url, payload: submitted.append(payload["answer"]) or {"correct": payload["answer"] == 7.0})
+    app.solver.answer_memo.put("k", 5.0)
+    results = []
+    app.solver._solve_with_memo("k", lambda: 7.0, "http://s", {"url": "u"}, results)
+    assert submitted == [5.0, 7.0]
+    assert [r["memo_hit"] for r in results] == [True, False]
+    assert app.solver.answer_memo.get("k") == 7.0
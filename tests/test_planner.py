@@ -0,0 +1,157 @@
+import threading
+import time
+import pandas as pd
+import app.planner
+import app.solver
+from app.planner import Plan, Planner, PlannerBackend, RuleBasedBackend, get_planner, register_backend
+from app.solver import _execute_plan
+
+
+class CountingBackend(RuleBasedBackend):
+    def __init__(self):
+        self.calls = []
+
+    def plan_batch(self, instructions):
+        self.calls.append(list(instructions))
+        return super().plan_batch(instructions)
+
+
+class FailingBackend(PlannerBackend):
+    def plan_batch(self, instructions):
+        raise RuntimeError("backend down")
+
+
+class TruncatingBackend(RuleBasedBackend):
+    def plan_batch(self, instructions):
+        return super().plan_batch(instructions)[:-1]
+
+
+class GatedPlanner(Planner):
+    """Leader waits until `expected` callers are pending instead of sleeping a fixed window."""
+
+    def __init__(self, backend, expected):
+        super().__init__(backend, batch_window_ms=0)
+        self.expected = expected
+
+    def _wait_for_batch(self):
+        deadline = time.monotonic() + 5
+        while len(self._pending) < self.expected and time.monotonic() < deadline:
+            time.sleep(0.001)
+
+
+def _plan_concurrently(planner, texts):
+    results = {}
+    threads = [threading.Thread(target=lambda t=t: results.__setitem__(t, planner.plan(t, timeout=5))) for t in texts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert not any(t.is_alive() for t in threads)
+    return results
+
+
+def test_rule_backend_parses_pdf_sum():
+    [plan] = RuleBasedBackend().plan_batch(['Download the PDF. What is the sum of the "value" column on page 2?'])
+    assert plan == Plan(source="pdf", operation="sum", output="number", page=2, column="value")
+
+def test_rule_backend_no_plan():
+    assert RuleBasedBackend().plan_batch(["Hello there"]) == [None]
+
+def test_rule_backend_picks_earliest_operation_and_ignores_plain_mean():
+    [plan] = RuleBasedBackend().plan_batch(
+        ["Scrape the table. What does this mean? Find the sum of the value column. Then plot it."])
+    assert plan.operation == "sum" and plan.column == "value"
+    [plan] = RuleBasedBackend().plan_batch(["What is the mean of the price column?"])
+    assert plan.operation == "mean"
+
+def test_rule_backend_rejects_what_a_plan_cannot_express():
+    texts = [
+        "Compute the count of rows where value > 10",
+        "Sum the value column for rows greater than 5",
+        "Sum the value column per region",
+        "Total of the value column grouped by city",
+        "POST the total to /submit",
+    ]
+    assert RuleBasedBackend().plan_batch(texts) == [None] * len(texts)
+
+def test_planner_caches_by_fingerprint():
+    backend = CountingBackend()
+    planner = Planner(backend, batch_window_ms=0)
+    a = planner.plan("Sum the value column. email=a@x.com")
+    b = planner.plan("Sum the value column. email=b@y.com")
+    assert a == b and len(backend.calls) == 1
+
+def test_planner_batches_concurrent_calls():
+    backend = CountingBackend()
+    texts = ["Sum the value column", "Average of the price column", "Max of the qty column"]
+    results = _plan_concurrently(GatedPlanner(backend, expected=3), texts)
+    assert len(backend.calls) == 1 and len(backend.calls[0]) == 3
+    assert results["Average of the price column"].operation == "mean"
+
+def test_planner_backend_failure_returns_none_without_hanging():
+    texts = ["Sum the value column", "Max of the qty column"]
+    results = _plan_concurrently(GatedPlanner(FailingBackend(), expected=2), texts)
+    assert results == {t: None for t in texts}
+
+def test_planner_wrong_plan_count_returns_none_without_hanging():
+    texts = ["Sum the value column", "Max of the qty column"]
+    results = _plan_concurrently(GatedPlanner(TruncatingBackend(), expected=2), texts)
+    assert results == {t: None for t in texts}
+
+def test_plan_timeout_applies_to_the_leader():
+    class SlowBackend(RuleBasedBackend):
+        def plan_batch(self, instructions):
+            time.sleep(1)
+            return super().plan_batch(instructions)
+
+    planner = Planner(SlowBackend(), batch_window_ms=0)
+    start = time.monotonic()
+    assert planner.plan("Sum the value column", timeout=0.1) is None
+    assert time.monotonic() - start < 0.5
+
+def test_plan_cache_uses_planner_settings(monkeypatch):
+    monkeypatch.setattr(app.planner, "PLANNER_CACHE_TTL_SECONDS", 123)
+    monkeypatch.setattr(app.planner, "PLANNER_CACHE_MAX_ENTRIES", 7)
+    cache = Planner(RuleBasedBackend())._cache
+    assert (cache.ttl_seconds, cache.max_entries) == (123, 7)
+
+def test_backend_interface_is_abstract():
+    try:
+        PlannerBackend()
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("PlannerBackend should not be instantiable")
+
+def test_registered_backend_is_selected(monkeypatch):
+    class CustomBackend(RuleBasedBackend):
+        pass
+
+    monkeypatch.setattr(app.planner, "_BACKENDS", dict(app.planner._BACKENDS))
+    monkeypatch.setattr(app.planner, "_planner", None)
+    monkeypatch.setattr(app.planner, "PLANNER_BACKEND", "custom")
+    register_backend("custom", CustomBackend)
+    assert isinstance(get_planner().backend, CustomBackend)
+
+def test_unknown_backend_falls_back_to_rules(monkeypatch):
+    monkeypatch.setattr(app.planner, "_planner", None)
+    monkeypatch.setattr(app.planner, "PLANNER_BACKEND", "llm")
+    assert type(get_planner().backend) is RuleBasedBackend
+
+def test_execute_plan_on_dataframe():
+    df = pd.DataFrame({"name": ["a", "b"], "value": ["1,000", "2"]})
+    assert _execute_plan(Plan("html_table", "sum", "number", column="value"), df) == 1002.0
+    assert _execute_plan(Plan("html_table", "count", "number"), df) == 2
+
+def test_execute_chart_plan_uses_named_column(monkeypatch):
+    plotted = []
+    monkeypatch.setattr(app.solver, "_make_plot_datauri_from_df", lambda df: plotted.append(list(df.columns)) or "uri")
+    df = pd.DataFrame({"qty": [1, 2], "price": ["3", "4"]})
+    assert _execute_plan(Plan("html_table", "chart", "image", column="price"), df) == "uri"
+    assert plotted == [["price"]]
+    assert _execute_plan(Plan("html_table", "chart", "image", column="missing"), df) is None
+
+def test_execute_plan_missing_or_untyped_columns():
+    df = pd.DataFrame({"name": ["a", "b"], "amount": ["$3", "4"]})  # object dtype, as from pdfplumber
+    assert _execute_plan(Plan("pdf", "sum", "number", column="price"), df) is None
+    assert _execute_plan(Plan("pdf", "sum", "number"), df) == 7.0